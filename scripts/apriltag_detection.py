@@ -38,7 +38,10 @@ class TagFollower:
             self.image_sub = rospy.Subscriber(
                 "/camera/rgb/image_raw",
                 Image,
-                self.camera_callback
+                self.camera_callback,
+                queue_size=1,
+                buff_size=2**24,
+                tcp_nodelay=True
             )
         else:
             # Subscriber which will get images from the topic
@@ -46,13 +49,17 @@ class TagFollower:
             self.image_sub = rospy.Subscriber(
                 "/raspicam_node/image/compressed",
                 CompressedImage,
-                self.camera_callback
+                self.camera_callback,
+                queue_size=1,
+                buff_size=2**24,
+                tcp_nodelay=True
             )
 
         # Publisher to publish data for april tag following to
-        # the topic '/apriltag_following'
+        # the topic '/apriltag_following' (latest-only state, so
+        # queue_size=1)
         self.tag_follow_pub = rospy.Publisher(
-            "/apriltag_following", Float32MultiArray, queue_size=10
+            "/apriltag_following", Float32MultiArray, queue_size=1
         )
 
         # Init threshold of april tag area
@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 
 # Import libraries
+import array
+import ast
+import queue
+import threading
+
 import cv2
 import numpy as np
 import rospy
@@ -10,6 +15,81 @@ from sensor_msgs.msg import Image, CompressedImage
 from std_msgs.msg import Float32MultiArray
 from pid_controller import PID
 
+# Numba is optional; fall back to the cv2 cvtColor+inRange path
+# when it is not installed
+try:
+    from numba import njit, prange
+    numba_available = True
+except ImportError:
+    numba_available = False
+
+
+# Minimal OpenCV builds can ship without inRange
+has_inrange = hasattr(cv2, 'inRange')
+
+
+def inrange_swar(img, lower, upper):
+    """
+    Branchless numpy replacement for cv2.inRange on a uint8
+    3-channel image.
+
+    Uses the classic (x - lo) | (hi - x) range test: the sign bit of
+    the OR is clear only when lo <= x <= hi. Widening to int16
+    provides the borrow bit the byte-level SWAR trick relies on;
+    numpy's elementwise ops already run SIMD-wide, so no manual
+    uint32 lane packing is needed.
+    """
+    x = img.astype(np.int16)
+    in_range = (((x - lower) | (upper - x)) >= 0).all(axis=2)
+    return in_range.astype(np.uint8) * 255
+
+
+if numba_available:
+    @njit(parallel=True, cache=True)
+    def bgr_inrange_hsv(img, lower, upper, mask):
+        """
+        Fused BGR->HSV conversion and range test.
+
+        Inlines the OpenCV 8-bit HSV formula (H in [0, 180]) per
+        pixel and writes 0/255 directly into the preallocated mask,
+        so no intermediate HSV image is ever allocated.
+        """
+        rows, cols = img.shape[0], img.shape[1]
+        for i in prange(rows):
+            for j in range(cols):
+                # Widen to int so channel differences cannot wrap
+                b = int(img[i, j, 0])
+                g = int(img[i, j, 1])
+                r = int(img[i, j, 2])
+
+                v = max(b, g, r)
+                diff = v - min(b, g, r)
+
+                if v == 0:
+                    s = 0
+                else:
+                    s = int(255.0 * diff / v + 0.5)
+
+                if diff == 0:
+                    h = 0
+                else:
+                    if v == r:
+                        hf = 30.0 * (g - b) / diff
+                    elif v == g:
+                        hf = 60.0 + 30.0 * (b - r) / diff
+                    else:
+                        hf = 120.0 + 30.0 * (r - g) / diff
+                    if hf < 0.0:
+                        hf += 180.0
+                    h = int(hf + 0.5)
+
+                if lower[0] <= h <= upper[0] and \
+                        lower[1] <= s <= upper[1] and \
+                        lower[2] <= v <= upper[2]:
+                    mask[i, j] = 255
+                else:
+                    mask[i, j] = 0
+
 
 class LineFollower:
     """
@@ -37,7 +117,10 @@ class LineFollower:
             self.image_sub = rospy.Subscriber(
                 "/camera/rgb/image_raw",
                 Image,
-                self.camera_callback
+                self.camera_callback,
+                queue_size=1,
+                buff_size=2**24,
+                tcp_nodelay=True
             )
         else:
             # Subscriber which will get images from the topic
@@ -45,20 +128,24 @@ class LineFollower:
             self.image_sub = rospy.Subscriber(
                 "/raspicam_node/image/compressed",
                 CompressedImage,
-                self.camera_callback
+                self.camera_callback,
+                queue_size=1,
+                buff_size=2**24,
+                tcp_nodelay=True
             )
 
         # Publisher to publish data for line following to
-        # the topic '/line_following'
+        # the topic '/line_following' (latest-only state, so
+        # queue_size=1)
         self.line_following_pub = rospy.Publisher(
-            "/line_following", Float32MultiArray, queue_size=10
+            "/line_following", Float32MultiArray, queue_size=1
         )
 
-        # Init the publish rate
-        self.rate = rospy.Rate(10)
-
-        # Init the line-following message
+        # Init the line-following message; the payload is a reused
+        # float array that is slice-assigned each frame instead of
+        # rebuilding a Python list per callback
         self.line_following_msg = Float32MultiArray()
+        self._line_data = array.array('f', [0.0, 0.0, 0.0])
 
         # Init PID controller
         Kp = rospy.get_param('~Kp')
@@ -69,9 +156,50 @@ class LineFollower:
         # Init center shift
         self.center_shift = rospy.get_param('~line_center_shift')
 
-        # Init the lower bound and upper bound of the specific color
-        self.lower_HSV = np.array(eval(rospy.get_param('~lower_HSV')))
-        self.upper_HSV = np.array(eval(rospy.get_param('~upper_HSV')))
+        # Real-world frames are decoded at half resolution
+        # (IMREAD_REDUCED_COLOR_2); published coordinates and the PID
+        # error are scaled back to full-resolution pixels
+        self.decode_scale = 1 if self.work_mode == 'simulation' else 2
+
+        # Init the lower bound and upper bound of the specific
+        # color; uint8 bounds let cv2.inRange skip an internal cast
+        # per call, and literal_eval avoids eval on a rosparam
+        self.lower_HSV = np.array(
+            ast.literal_eval(rospy.get_param('~lower_HSV')),
+            dtype=np.uint8
+        )
+        self.upper_HSV = np.array(
+            ast.literal_eval(rospy.get_param('~upper_HSV')),
+            dtype=np.uint8
+        )
+        if self.lower_HSV.shape != (3,) or self.upper_HSV.shape != (3,):
+            raise ValueError(
+                '~lower_HSV and ~upper_HSV must be 3-element lists'
+            )
+
+        # Preallocated mask for the fused Numba kernel; sized on the
+        # first frame once the image resolution is known
+        self._mask = None
+
+        # Geometric constants hoisted out of the per-frame math;
+        # computed on the first frame once the resolution is known
+        self._half_w_shift = None
+        self._y_offset = None
+
+        # When the Numba kernel is unavailable, run the cv2 fallback
+        # through the T-API (UMat) if an OpenCL device exists so
+        # cvtColor and inRange execute on the iGPU
+        self.use_opencl = not numba_available and cv2.ocl.haveOpenCL()
+
+        # Two-stage pipeline: the ROS thread only decodes and crops,
+        # a worker thread thresholds, finds the centroid and
+        # publishes, so JPEG decode overlaps with processing.
+        # maxsize=1 drops frames whenever the worker is still busy.
+        self._queue = queue.Queue(maxsize=1)
+        self._worker = threading.Thread(
+            target=self._process_loop, daemon=True
+        )
+        self._worker.start()
 
 
     def camera_callback(self, image):
@@ -88,46 +216,112 @@ class LineFollower:
             )
         else:
             cv_np_arr = np.frombuffer(image.data, np.uint8)
-            img_raw = cv2.imdecode(cv_np_arr, cv2.IMREAD_COLOR)
+            # Half-resolution decode via libjpeg's built-in 1/2 IDCT
+            # scaling; far cheaper than decoding the full frame just
+            # to crop out a thin strip
+            img_raw = cv2.imdecode(cv_np_arr, cv2.IMREAD_REDUCED_COLOR_2)
 
         # Crop the parts of the image we don't need
         height, width, _ = img_raw.shape
-        upper_bound, lower_bound = 180, 230
-        crop_img = img_raw[int(height/2) + \
-                upper_bound:int(height/2) + lower_bound][:]
-        
-        # Convert from RGB to HSV
-        hsv = cv2.cvtColor(crop_img, cv2.COLOR_BGR2HSV)
-
-        # Threshold the HSV image to get only specific colors
-        mask = cv2.inRange(hsv, self.lower_HSV, self.upper_HSV)
+        upper_bound = 180 // self.decode_scale
+        lower_bound = 230 // self.decode_scale
+        crop_img = img_raw[height // 2 + \
+                upper_bound:height // 2 + lower_bound][:]
 
-        m = cv2.moments(mask, False)
+        # Hand the strip to the worker thread; drop the frame if it
+        # is still busy with the previous one
         try:
-            cx, cy = int(m['m10']/m['m00']), int(m['m01']/m['m00'])
-            found_blob = True
-        except ZeroDivisionError:
+            self._queue.put_nowait(
+                (crop_img, height, width, upper_bound)
+            )
+        except queue.Full:
+            pass
+
+
+    def _process_loop(self):
+        """
+        Worker loop that runs the thresholding, centroid and publish
+        stages on its own thread, overlapping them with the JPEG
+        decode in camera_callback.
+        """
+        while not rospy.is_shutdown():
+            try:
+                crop_img, height, width, upper_bound = \
+                    self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            self._process(crop_img, height, width, upper_bound)
+
+
+    def _process(self, crop_img, height, width, upper_bound):
+        """
+        Threshold the cropped strip, find the line centroid and
+        publish the line-following message.
+        """
+        if numba_available:
+            # Fused BGR->HSV threshold; writes the mask in one pass
+            # without allocating an intermediate HSV image
+            if self._mask is None or self._mask.shape != crop_img.shape[:2]:
+                self._mask = np.empty(crop_img.shape[:2], np.uint8)
+            bgr_inrange_hsv(
+                crop_img, self.lower_HSV, self.upper_HSV, self._mask
+            )
+            mask = self._mask
+        else:
+            if self.use_opencl:
+                crop_img = cv2.UMat(crop_img)
+
+            # Convert from RGB to HSV
+            hsv = cv2.cvtColor(crop_img, cv2.COLOR_BGR2HSV)
+
+            if has_inrange:
+                # Threshold the HSV image to get only specific colors
+                mask = cv2.inRange(hsv, self.lower_HSV, self.upper_HSV)
+
+                if self.use_opencl:
+                    # findNonZero needs the mask back on the host
+                    mask = mask.get()
+            else:
+                if self.use_opencl:
+                    hsv = hsv.get()
+                mask = inrange_swar(hsv, self.lower_HSV, self.upper_HSV)
+
+        # Centroid from the nonzero mask pixels; cheaper than
+        # cv2.moments, which also computes the unused higher-order
+        # moments
+        pts = cv2.findNonZero(mask)
+        if pts is None:
             found_blob = False
+        else:
+            mean = pts.mean(axis=0)[0]
+            cx, cy = int(mean[0]), int(mean[1])
+            found_blob = True
+
+        if self._y_offset is None:
+            self._half_w_shift = \
+                (width / 2) * self.decode_scale - self.center_shift
+            self._y_offset = \
+                (height / 2 + upper_bound) * self.decode_scale
 
         # PID Controller
         if found_blob:
-            # Determine the angular velocity
-            error = cx - width / 2 + self.center_shift
+            # Determine the angular velocity; error is kept in
+            # full-resolution pixels so the PID gains are unchanged
+            cx_full = cx * self.decode_scale
+            error = cx_full - self._half_w_shift
             angular_vel = self.pid_object.update(error) / 450
 
-            # Create the msg to publish
-            self.line_following_msg.data = [
-                cx,
-                cy + height / 2 + upper_bound,
-                angular_vel
-            ]
+            # Update the reused payload in place
+            self._line_data[0] = cx_full
+            self._line_data[1] = cy * self.decode_scale + self._y_offset
+            self._line_data[2] = angular_vel
+            self.line_following_msg.data = self._line_data
         else:
             # Update the msg
             self.line_following_msg.data = []
 
         # Publish the data to '/line_following'
         self.line_following_pub.publish(self.line_following_msg)
-        self.rate.sleep()
 
 
 def main():
@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+import ast
+
 import cv2
 import numpy as np
 import rospy
@@ -9,6 +11,79 @@ from std_msgs.msg import Float32MultiArray
 
 from PID_controller import PID
 
+# Numba is optional; fall back to the cv2 cvtColor+inRange path
+# when it is not installed
+try:
+    from numba import njit, prange
+    numba_available = True
+except ImportError:
+    numba_available = False
+
+
+if numba_available:
+    @njit(parallel=True, cache=True)
+    def bgr_inrange_lab(img, lower, upper, mask):
+        """
+        Fused BGR->LAB conversion and range test.
+
+        Inlines the OpenCV 8-bit LAB formula (sRGB gamma, D65 white
+        point, L scaled to [0, 255], a/b offset by 128) per pixel
+        and writes 0/255 directly into the preallocated mask, so no
+        intermediate LAB image is ever allocated.
+        """
+        rows, cols = img.shape[0], img.shape[1]
+        for i in prange(rows):
+            for j in range(cols):
+                b = img[i, j, 0] / 255.0
+                g = img[i, j, 1] / 255.0
+                r = img[i, j, 2] / 255.0
+
+                # sRGB inverse gamma
+                if b > 0.04045:
+                    b = ((b + 0.055) / 1.055) ** 2.4
+                else:
+                    b = b / 12.92
+                if g > 0.04045:
+                    g = ((g + 0.055) / 1.055) ** 2.4
+                else:
+                    g = g / 12.92
+                if r > 0.04045:
+                    r = ((r + 0.055) / 1.055) ** 2.4
+                else:
+                    r = r / 12.92
+
+                # RGB -> XYZ (D65), normalized by the white point
+                x = (0.412453 * r + 0.357580 * g + 0.180423 * b) \
+                    / 0.950456
+                y = 0.212671 * r + 0.715160 * g + 0.072169 * b
+                z = (0.019334 * r + 0.119193 * g + 0.950227 * b) \
+                    / 1.088754
+
+                # f() with the linear toe for small values
+                if x > 0.008856:
+                    fx = x ** (1.0 / 3.0)
+                else:
+                    fx = 7.787 * x + 16.0 / 116.0
+                if y > 0.008856:
+                    fy = y ** (1.0 / 3.0)
+                else:
+                    fy = 7.787 * y + 16.0 / 116.0
+                if z > 0.008856:
+                    fz = z ** (1.0 / 3.0)
+                else:
+                    fz = 7.787 * z + 16.0 / 116.0
+
+                l_val = int((116.0 * fy - 16.0) * 255.0 / 100.0 + 0.5)
+                a_val = int(500.0 * (fx - fy) + 128.0 + 0.5)
+                b_val = int(200.0 * (fy - fz) + 128.0 + 0.5)
+
+                if lower[0] <= l_val <= upper[0] and \
+                        lower[1] <= a_val <= upper[1] and \
+                        lower[2] <= b_val <= upper[2]:
+                    mask[i, j] = 255
+                else:
+                    mask[i, j] = 0
+
 # Use LAB color space values to generate mask
 # If we can't differentiat we can modify the LAB color space such that we can improve differentiation in HSV color space
 
@@ -22,18 +97,19 @@ class LineFollower:
         if self.work_mode == 'simulation':
             # Subscriber which will get images from the topic 'camera/rgb/image_raw'
             self.image_sub = rospy.Subscriber(
-                "/camera/rgb/image_raw", Image, self.camera_callback)
+                "/camera/rgb/image_raw", Image, self.camera_callback,
+                queue_size=1, buff_size=2**24, tcp_nodelay=True)
         else:
             # Subscriber which will get images from the topic '/raspicam_node/image/compressed'
             self.image_sub = rospy.Subscriber(
-                "/raspicam_node/image/compressed", CompressedImage, self.camera_callback)
+                "/raspicam_node/image/compressed", CompressedImage,
+                self.camera_callback,
+                queue_size=1, buff_size=2**24, tcp_nodelay=True)
 
         # Publisher which will publish to the the topic '/line_following'
+        # (latest-only state, so queue_size=1)
         self.line_following_pub = rospy.Publisher(
-            "/line_following", Float32MultiArray, queue_size=10)
-
-        # Init the publish rate
-        self.rate = rospy.Rate(10)
+            "/line_following", Float32MultiArray, queue_size=1)
 
         # Init the line-following message
         self.line_following_msg = Float32MultiArray()
@@ -47,14 +123,40 @@ class LineFollower:
         # Center shift
         self.center_shift = rospy.get_param('~line_center_shift')
 
-        # Init the lower bound and upper bound of the specific color
+        # Show intermediate images only when debugging; cv2.imshow
+        # costs several ms per call on the Pi
+        self.debug = rospy.get_param('~debug', False)
+
+        # Init the lower bound and upper bound of the specific
+        # color; uint8 bounds let cv2.inRange skip an internal cast
+        # per call, and literal_eval avoids eval on a rosparam
         if self.work_mode == 'simulation':
-            self.lower_HSV = np.array(eval(rospy.get_param('~lower_HSV')))
-            self.upper_HSV = np.array(eval(rospy.get_param('~upper_HSV')))
+            self.lower_HSV = np.array(
+                ast.literal_eval(rospy.get_param('~lower_HSV')),
+                dtype=np.uint8)
+            self.upper_HSV = np.array(
+                ast.literal_eval(rospy.get_param('~upper_HSV')),
+                dtype=np.uint8)
+            if self.lower_HSV.shape != (3,) \
+                    or self.upper_HSV.shape != (3,):
+                raise ValueError(
+                    '~lower_HSV and ~upper_HSV must be 3-element lists')
         else:
             # for LAB parametrization
-            self.lower_LAB = np.array(eval(rospy.get_param('~lower_LAB')))
-            self.upper_LAB = np.array(eval(rospy.get_param('~upper_LAB')))
+            self.lower_LAB = np.array(
+                ast.literal_eval(rospy.get_param('~lower_LAB')),
+                dtype=np.uint8)
+            self.upper_LAB = np.array(
+                ast.literal_eval(rospy.get_param('~upper_LAB')),
+                dtype=np.uint8)
+            if self.lower_LAB.shape != (3,) \
+                    or self.upper_LAB.shape != (3,):
+                raise ValueError(
+                    '~lower_LAB and ~upper_LAB must be 3-element lists')
+
+        # Preallocated mask for the fused Numba kernel; sized on the
+        # first frame once the image resolution is known
+        self._mask = None
 
     def camera_callback(self, image):
         if self.work_mode == 'simulation':
@@ -68,35 +170,50 @@ class LineFollower:
         # Crop the parts of the image we don't need
         height, width, _ = img_raw.shape
         upper_bound, lower_bound = 180, 230
-        crop_img = img_raw[int(height/2) +
-                           upper_bound:int(height/2) + lower_bound][:]
-        
+        crop_img = img_raw[height // 2 +
+                           upper_bound:height // 2 + lower_bound][:]
+
         #crop_img = (crop_img * 1.9).astype(np.uint8)
         #crop_img = np.where(crop_img > 255, 255, crop_img)
 
-        cv2.imshow("Crop", crop_img)
-        cv2.waitKey(1)
+        if self.debug:
+            cv2.imshow("Crop", crop_img)
+            cv2.waitKey(1)
 
         if self.work_mode == 'simulation':
             # Convert from RGB to HSV
             hsv = cv2.cvtColor(crop_img, cv2.COLOR_BGR2HSV)
             # Threshold the HSV image to get only specific colors
             mask = cv2.inRange(hsv, self.lower_HSV, self.upper_HSV)
+        elif numba_available:
+            # Fused BGR->LAB threshold; writes the mask in one pass
+            # without allocating an intermediate LAB image
+            if self._mask is None or self._mask.shape != crop_img.shape[:2]:
+                self._mask = np.empty(crop_img.shape[:2], np.uint8)
+            bgr_inrange_lab(
+                crop_img, self.lower_LAB, self.upper_LAB, self._mask
+            )
+            mask = self._mask
         else:
             # Convert from RGB to LAB
             lab = cv2.cvtColor(crop_img, cv2.COLOR_BGR2LAB)
             # Threshold the LAB image to get only specific colors
-            mask = cv2.inRange(lab, self.lower_LAB, self.upper_LAB) 
+            mask = cv2.inRange(lab, self.lower_LAB, self.upper_LAB)
 
         # Find the centroid
-        cv2.imshow("Mask", mask)
-        cv2.waitKey(1)
-        m = cv2.moments(mask, False)
-        try:
-            cx, cy = int(m['m10']/m['m00']), int(m['m01']/m['m00'])
-            found_blob = True
-        except ZeroDivisionError:
+        if self.debug:
+            cv2.imshow("Mask", mask)
+            cv2.waitKey(1)
+        # Centroid from the nonzero mask pixels; cheaper than
+        # cv2.moments, which also computes the unused higher-order
+        # moments
+        pts = cv2.findNonZero(mask)
+        if pts is None:
             found_blob = False
+        else:
+            mean = pts.mean(axis=0)[0]
+            cx, cy = int(mean[0]), int(mean[1])
+            found_blob = True
 
         # PID Controller
         if found_blob:
@@ -113,7 +230,6 @@ class LineFollower:
 
         # Publish
         self.line_following_pub.publish(self.line_following_msg)
-        self.rate.sleep()
 
 
 def main():
@@ -32,23 +32,6 @@ class NodeController:
         # Init the work mode (simulation or real-world)
         self.work_mode = rospy.get_param('~work_mode')
 
-        if self.work_mode == 'simulation':
-            # Subscriber which will get images from the topic
-            # '/camera/rgb/image_raw'
-            self.image_sub = rospy.Subscriber(
-                "/camera/rgb/image_raw",
-                Image,
-                self.camera_callback
-            )
-        else:
-            # Subscriber which will get images from the topic
-            # '/raspicam_node/image/compressed'
-            self.image_sub = rospy.Subscriber(
-                "/raspicam_node/image/compressed",
-                CompressedImage,
-                self.camera_callback
-            )
-
         # Subscriber which will get obstacle avoidance decision
         # from the topic '/obstacle_avoidance'
         self.obstacle_avoidance_sub = rospy.Subscriber(
@@ -93,6 +76,36 @@ class NodeController:
         # Init threshold of stop delay for stop sign
         self.stop_delay = rospy.get_param('~stop_delay')
 
+        # Decode and display the camera feed with overlays only when
+        # debugging; the state machine itself never needs the image
+        self.debug = rospy.get_param('~debug', False)
+
+        # The camera feed is only subscribed for the debug overlay;
+        # skipping it saves a full image transport per frame
+        if self.debug:
+            if self.work_mode == 'simulation':
+                # Subscriber which will get images from the topic
+                # '/camera/rgb/image_raw'
+                self.image_sub = rospy.Subscriber(
+                    "/camera/rgb/image_raw",
+                    Image,
+                    self.camera_callback,
+                    queue_size=1,
+                    buff_size=2**24,
+                    tcp_nodelay=True
+                )
+            else:
+                # Subscriber which will get images from the topic
+                # '/raspicam_node/image/compressed'
+                self.image_sub = rospy.Subscriber(
+                    "/raspicam_node/image/compressed",
+                    CompressedImage,
+                    self.camera_callback,
+                    queue_size=1,
+                    buff_size=2**24,
+                    tcp_nodelay=True
+                )
+
         # Init method to move the TurtleBot
         self.moveTurtlebot3_object = MoveTurtleBot3()
 
@@ -133,6 +146,16 @@ class NodeController:
         # Init timer for obstacle avoidance
         self.timer_obs_avd = 0
 
+        # Last (linear.x, angular.z) handed to move_robot; used to
+        # skip re-sending unchanged commands
+        self._last_sent_vel = None
+
+        # Drive the mode state machine from a 10 Hz timer instead of
+        # the camera stream
+        self.control_timer = rospy.Timer(
+            rospy.Duration(0.1), self._on_timer
+        )
+
 
     def mode_decider(self):
         """
@@ -229,12 +252,10 @@ class NodeController:
         return img
 
 
-    def camera_callback(self, image):
+    def _on_timer(self, event):
         """
-        Function for camera callback that is called everytime data is
-        published to the camera topic ('/camera/rgb/image_raw' for
-        simulated run and '/raspicam_node/image/compressed' for real
-        world run.
+        Timer callback that runs the mode state machine and moves
+        the TurtleBot at 10 Hz, independent of the camera stream.
         """
         # Threshold of transition
         if self.mode_timer == 0:
@@ -245,30 +266,6 @@ class NodeController:
             self.mode_decider()
             self.mode_timer = 0
 
-        if self.work_mode == 'simulation':
-            # Select bgr8 because its the OpenCV encoding by default
-            cv_image = self.bridge_object.imgmsg_to_cv2(
-                image,
-                desired_encoding="bgr8"
-            )
-        else:
-            cv_np_arr = np.frombuffer(image.data, np.uint8)
-            cv_image = cv2.imdecode(cv_np_arr, cv2.IMREAD_COLOR)
-
-        # Print mode information on the camera video
-        cv_image = cv2.putText(
-            cv_image,
-            'Mode: ' + self.modes[self.mode],
-            (15, 15),
-            cv2.FONT_HERSHEY_COMPLEX_SMALL,
-            1,
-            (0, 0, 255),
-            1
-        )
-
-        # Draw detected results on camera image
-        cv_image = self.draw_detections(cv_image)
-
         if self.mode == 1:
             # Obstacle Avoidance and Wall Following mode
             self.vel_msg.linear.x = self.obstacle_avoidance_info[0]
@@ -350,10 +347,50 @@ class NodeController:
                     # Tag went out of frame to the left
                     self.vel_msg.angular.z = 0.05
 
+        # Move the TurtleBot; only re-send when the command changed,
+        # since move_robot blocks until the Twist is echoed back and
+        # identical commands at 10 Hz are a no-op for the robot
+        vel = (self.vel_msg.linear.x, self.vel_msg.angular.z)
+        if vel != self._last_sent_vel:
+            self.moveTurtlebot3_object.move_robot(self.vel_msg)
+            self._last_sent_vel = vel
+
+
+    def camera_callback(self, image):
+        """
+        Debug-only camera callback that overlays the current mode,
+        the detections and the commanded velocity on the camera
+        feed. Only subscribed when '~debug' is set.
+        """
+        if self.work_mode == 'simulation':
+            # Select bgr8 because its the OpenCV encoding by default
+            cv_image = self.bridge_object.imgmsg_to_cv2(
+                image,
+                desired_encoding="bgr8"
+            )
+        else:
+            cv_np_arr = np.frombuffer(image.data, np.uint8)
+            cv_image = cv2.imdecode(cv_np_arr, cv2.IMREAD_COLOR)
+
+        # Print mode information on the camera video
+        cv_image = cv2.putText(
+            cv_image,
+            'Mode: ' + self.modes[self.mode],
+            (15, 15),
+            cv2.FONT_HERSHEY_COMPLEX_SMALL,
+            1,
+            (0, 0, 255),
+            1
+        )
+
+        # Draw detected results on camera image
+        cv_image = self.draw_detections(cv_image)
+
         # Print velocity information on the camera video
         cv_image = cv2.putText(
             cv_image,
-            'Vel (x, z): ' + str(round(self.vel_msg.linear.x, 2)) + ',',
+            'Vel (x, z): '
+            + str(round(self.vel_msg.linear.x, 2)) + ',',
             (370, 15),
             cv2.FONT_HERSHEY_COMPLEX_SMALL,
             1,
@@ -371,9 +408,6 @@ class NodeController:
             1
         )
 
-        # Move the TurtleBot
-        self.moveTurtlebot3_object.move_robot(self.vel_msg)
-
         # Show the captured image
         cv2.imshow("Camera", cv_image)
         cv2.waitKey(1)
@@ -40,7 +40,10 @@ class StopSignDetection:
             self.image_sub = rospy.Subscriber(
                 "/camera/rgb/image_raw",
                 Image,
-                self.camera_callback
+                self.camera_callback,
+                queue_size=1,
+                buff_size=2**24,
+                tcp_nodelay=True
             )
         else:
             # Subscriber which will get images from the topic
@@ -48,22 +51,23 @@ class StopSignDetection:
             self.image_sub = rospy.Subscriber(
                 "/raspicam_node/image/compressed",
                 CompressedImage,
-                self.camera_callback
+                self.camera_callback,
+                queue_size=1,
+                buff_size=2**24,
+                tcp_nodelay=True
             )
 
         # Publisher which will publish to the topic '/stop_sign'
+        # (latest-only state, so queue_size=1)
         self.stop_sign_pub = rospy.Publisher(
             '/stop_sign',
             Float32MultiArray,
-            queue_size=10
+            queue_size=1
         )
 
         # Init the stop sign message
         self.stop_sign_msg = Float32MultiArray()
 
-        # Init the publish rate
-        self.rate = rospy.Rate(10)
-
         # Init the stop sign classifier
         self.stop_sign_classifier = cv2.CascadeClassifier(
             os.path.join(
@@ -72,6 +76,16 @@ class StopSignDetection:
             )
         )
 
+        # Real-world frames are decoded at half resolution
+        # (IMREAD_REDUCED_COLOR_2); published coordinates and the
+        # area are scaled back to full-resolution pixels
+        self.decode_scale = 1 if self.work_mode == 'simulation' else 2
+
+        # Run the cascade through OpenCV's T-API (UMat) when an
+        # OpenCL device is available, offloading the sliding-window
+        # search to the GPU
+        self.use_opencl = cv2.ocl.haveOpenCL()
+
 
     def camera_callback(self, image):
         """
@@ -85,22 +99,32 @@ class StopSignDetection:
             img_raw = self.bridge_object.imgmsg_to_cv2(
                 image, desired_encoding="bgr8"
             )
+            gray_image = cv2.cvtColor(img_raw, cv2.COLOR_BGR2GRAY)
         else:
             cv_np_arr = np.frombuffer(image.data, np.uint8)
-            img_raw = cv2.imdecode(cv_np_arr, cv2.IMREAD_COLOR)
+            # Decode only the JPEG luminance plane at half
+            # resolution; skips the chroma IDCT and the separate
+            # BGR2GRAY pass the cascade would otherwise need
+            gray_image = cv2.imdecode(
+                cv_np_arr, cv2.IMREAD_REDUCED_GRAYSCALE_2
+            )
 
         # Init stop sign
         stop_sign = []
 
         # Detect
-        gray_image = cv2.cvtColor(img_raw, cv2.COLOR_BGR2GRAY)
+        max_size = 120 // self.decode_scale
+        if self.use_opencl:
+            # detectMultiScale still returns numpy rects for UMat
+            # input
+            gray_image = cv2.UMat(gray_image)
         stop_sign = self.stop_sign_classifier.detectMultiScale(
             gray_image, 1.2, 5,
-            maxSize=(120, 120)
+            maxSize=(max_size, max_size)
         )
 
         if len(stop_sign) != 0:
-            stop_sign = list(stop_sign[0])
+            stop_sign = [v * self.decode_scale for v in stop_sign[0]]
 
             # Update the msg
             prob = 1
@@ -121,7 +145,6 @@ class StopSignDetection:
 
         # Publish the data to '/stop_sign'
         self.stop_sign_pub.publish(self.stop_sign_msg)
-        self.rate.sleep()
 
 
 def main():
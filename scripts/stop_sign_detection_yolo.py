@@ -12,13 +12,65 @@ from sensor_msgs.msg import Image, CompressedImage
 from std_msgs.msg import Float32MultiArray
 
 from yolov3.yolov3_tf2.models import YoloV3Tiny
-from yolov3.yolov3_tf2.dataset import transform_images
 
 
 # Get absolute base path for the folder containing the scripts
 base_path = os.path.dirname(os.path.abspath(__file__))
 
 
+def decode_dnn_detections(outputs, conf_threshold=0.5,
+                          nms_threshold=0.4):
+    """
+    Decode raw cv2.dnn YOLO outputs into the (boxes, scores,
+    classes, nums) layout produced by the TF model, so the callback
+    postprocessing is backend-agnostic. Boxes are (x1, y1, x2, y2)
+    as proportions of the frame.
+    """
+    all_boxes = []
+    all_scores = []
+    all_classes = []
+    for output in outputs:
+        # Rows are [cx, cy, w, h, objectness, class scores ...]
+        output = output.reshape(-1, output.shape[-1])
+        class_scores = output[:, 5:] * output[:, 4:5]
+        class_ids = np.argmax(class_scores, axis=1)
+        confidences = class_scores[
+            np.arange(len(class_ids)), class_ids
+        ]
+        keep = confidences > conf_threshold
+        for row, score, class_id in zip(
+                output[keep], confidences[keep], class_ids[keep]):
+            cx, cy, w, h = row[:4]
+            all_boxes.append(
+                [cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2]
+            )
+            all_scores.append(float(score))
+            all_classes.append(int(class_id))
+
+    if all_boxes:
+        indices = cv2.dnn.NMSBoxes(
+            [[x1, y1, x2 - x1, y2 - y1]
+             for x1, y1, x2, y2 in all_boxes],
+            all_scores, conf_threshold, nms_threshold
+        )
+        indices = np.array(indices).reshape(-1)
+    else:
+        indices = np.empty(0, np.int32)
+
+    boxes = np.array(
+        [all_boxes[i] for i in indices], np.float32
+    ).reshape(1, -1, 4)
+    scores = np.array(
+        [all_scores[i] for i in indices], np.float32
+    ).reshape(1, -1)
+    classes = np.array(
+        [all_classes[i] for i in indices], np.float32
+    ).reshape(1, -1)
+    nums = np.array([len(indices)], np.int32)
+
+    return boxes, scores, classes, nums
+
+
 class StopSignDetection:
     """
     Stop Sign Detection class for detecting stop sign using YOLOv3
@@ -44,7 +96,10 @@ class StopSignDetection:
             self.image_sub = rospy.Subscriber(
                 "/camera/rgb/image_raw",
                 Image,
-                self.camera_callback
+                self.camera_callback,
+                queue_size=1,
+                buff_size=2**24,
+                tcp_nodelay=True
             )
         else:
             # Subscriber which will get images from the topic
@@ -52,26 +107,39 @@ class StopSignDetection:
             self.image_sub = rospy.Subscriber(
                 "/raspicam_node/image/compressed",
                 CompressedImage,
-                self.camera_callback
+                self.camera_callback,
+                queue_size=1,
+                buff_size=2**24,
+                tcp_nodelay=True
             )
 
         # Publisher which will publish to the topic '/stop_sign'
+        # (latest-only state, so queue_size=1)
         self.stop_sign_pub = rospy.Publisher(
             '/stop_sign',
             Float32MultiArray,
-            queue_size=10
+            queue_size=1
         )
 
         # Init the stop sign message
         self.stop_sign_msg = Float32MultiArray()
 
-        # Init the publish rate
-        self.rate = rospy.Rate(10)
-
         # Init the YoloV3 model
         self.yolo = yolo
         self.class_names = class_names
 
+        # Precompute which class ids are stop signs so the per-frame
+        # filter is a bool-array lookup instead of a substring search
+        # per detection
+        self.is_stopsign = np.array(
+            ['stop sign' in c for c in class_names], dtype=bool
+        )
+
+        # Real-world frames are decoded at half resolution
+        # (IMREAD_REDUCED_COLOR_2); published coordinates and the
+        # area are scaled back to full-resolution pixels
+        self.decode_scale = 1 if self.work_mode == 'simulation' else 2
+
 
     def camera_callback(self, image):
         """
@@ -87,11 +155,13 @@ class StopSignDetection:
             )
         else:
             cv_np_arr = np.fromstring(image.data, np.uint8)
-            img_raw = cv2.imdecode(cv_np_arr, cv2.IMREAD_COLOR)
+            # Half-resolution decode via libjpeg's built-in 1/2 IDCT
+            # scaling; the frame is resized to 416x416 anyway
+            img_raw = cv2.imdecode(cv_np_arr, cv2.IMREAD_REDUCED_COLOR_2)
 
-        # Preprocess the image
-        img = tf.expand_dims(img_raw, 0)
-        img = transform_images(img, 416)
+        # Hand the raw uint8 frame to the backend, which does its
+        # own cast and 416x416 resize (on-device for the TF path)
+        img = img_raw[np.newaxis]
 
         # Detect objects in the image
         boxes, scores, classes, nums = self.yolo(img)
@@ -99,40 +169,38 @@ class StopSignDetection:
         # Convert the img to BGR
         img_raw = cv2.cvtColor(img_raw, cv2.COLOR_RGB2BGR)
 
-        stop_signs = []
-        # Loop through detections
-        for i in range(nums[0]):
-            # Get the detected stop sign
-            if 'stop sign' in self.class_names[int(classes[0][i])]:
-                # Get the probability of the detected stop sign
-                probability = scores[0][i].numpy()
-                # Convert the representation of the bounding box
-                # from proportion to pixel
-                wh = np.flip(img_raw.shape[0:2])
-                x1 = boxes[0][i][0].numpy() * wh[0]
-                y1 = boxes[0][i][1].numpy() * wh[1]
-                x2 = boxes[0][i][2].numpy() * wh[0]
-                y2 = boxes[0][i][3].numpy() * wh[1]
-                stop_signs.append([probability, x1, y1, x2, y2])
-            else:
-                continue
-
-        if stop_signs:
-            # Select the largest stop sign which should be the closest one
-            index_largest_stop_sign = 0
-            area_largest_stop_sign = 0
-            for i, stop_sign in enumerate(stop_signs):
-                area = abs((stop_sign[0] - stop_sign[2])
-                           * (stop_sign[1] - stop_sign[3]))
-                if area >= area_largest_stop_sign:
-                    index_largest_stop_sign = i
-                    area_largest_stop_sign = area
-
-            # Selected stop sign
-            stop_sign = stop_signs[index_largest_stop_sign]
+        # Copy each output tensor to host once; calling .numpy() per
+        # box forces a device sync for every scalar. np.asarray
+        # handles both eager tensors and the TFLite ndarrays.
+        n = int(nums[0])
+        boxes0 = np.asarray(boxes[0])[:n]
+        scores0 = np.asarray(scores[0])[:n]
+        classes0 = np.asarray(classes[0])[:n].astype(int)
+
+        # Keep only the stop-sign detections
+        keep = self.is_stopsign[classes0]
+
+        if keep.any():
+            # Convert the representation of the bounding boxes from
+            # proportion to pixel with one multiply
+            wh = np.flip(img_raw.shape[0:2]) * self.decode_scale
+            boxes_px = boxes0 * np.array(
+                [wh[0], wh[1], wh[0], wh[1]], np.float32
+            )
+
+            # Select the largest stop sign which should be the
+            # closest one
+            areas = abs(
+                (boxes_px[:, 2] - boxes_px[:, 0])
+                * (boxes_px[:, 3] - boxes_px[:, 1])
+            )
+            index = np.argmax(np.where(keep, areas, -1))
 
             # Update the msg
-            self.stop_sign_msg.data = stop_sign + [area_largest_stop_sign]
+            x1, y1, x2, y2 = boxes_px[index]
+            self.stop_sign_msg.data = [
+                scores0[index], x1, y1, x2, y2, areas[index]
+            ]
 
         else:
             # Update the msg
@@ -140,7 +208,6 @@ class StopSignDetection:
 
         # Publish
         self.stop_sign_pub.publish(self.stop_sign_msg)
-        self.rate.sleep()
 
 
 def main():
@@ -156,6 +223,75 @@ def main():
             )
         ).expect_partial()
 
+        # Prefer exported models over the TF2 graph: the OpenCV DNN
+        # backend (ONNX) uses SIMD int8/fp32 kernels without the TF
+        # Python binding cost, and the int8 TFLite model halves
+        # memory bandwidth on the Pi. Both are produced offline.
+        onnx_path = os.path.join(
+            base_path,
+            'yolov3/checkpoints/yolov3-tiny.onnx'
+        )
+        tflite_path = os.path.join(
+            base_path,
+            'yolov3/checkpoints/yolov3-tiny-int8.tflite'
+        )
+        if os.path.exists(onnx_path):
+            net = cv2.dnn.readNetFromONNX(onnx_path)
+            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+            out_names = net.getUnconnectedOutLayersNames()
+
+            def yolo_infer(x):
+                # blobFromImage scales, resizes and transposes to
+                # NCHW in a single native call
+                blob = cv2.dnn.blobFromImage(
+                    np.asarray(x[0]), 1 / 255.0, (416, 416)
+                )
+                net.setInput(blob)
+                outputs = net.forward(out_names)
+                return decode_dnn_detections(outputs)
+        elif os.path.exists(tflite_path):
+            interpreter = tf.lite.Interpreter(model_path=tflite_path)
+            interpreter.allocate_tensors()
+            input_details = interpreter.get_input_details()
+            output_details = interpreter.get_output_details()
+
+            def yolo_infer(x):
+                img = cv2.resize(
+                    np.asarray(x[0], np.float32) * (1.0 / 255.0),
+                    (416, 416)
+                )
+                interpreter.set_tensor(
+                    input_details[0]['index'], img[np.newaxis]
+                )
+                interpreter.invoke()
+                return tuple(
+                    interpreter.get_tensor(detail['index'])
+                    for detail in output_details
+                )
+        else:
+            # Compile inference to a concrete graph with a fixed
+            # input shape; avoids the per-call Keras dispatch and
+            # retrace overhead and lets XLA fuse the graph
+            # No jit_compile: the model ends in
+            # CombinedNonMaxSuppression, which has no XLA kernel,
+            # and mandatory compilation would raise on the first
+            # frame instead of falling back
+            @tf.function(
+                input_signature=[
+                    tf.TensorSpec([1, None, None, 3], tf.uint8)
+                ]
+            )
+            def yolo_infer(x):
+                # Cast and resize inside the graph: the frame is
+                # copied to the device as uint8 (4x less transfer
+                # than fp32) and resized there
+                x = tf.image.resize(
+                    tf.cast(x, tf.float32) * (1.0 / 255.0),
+                    (416, 416)
+                )
+                return yolo(x)
+
         # Load class names that can be detected
         class_names = [
             c.strip() for c in open(
@@ -168,8 +304,8 @@ def main():
 
         stop_sign_detection_object = StopSignDetection(
             node_name='stop_sign_detection',
-            yolo,
-            class_names
+            yolo=yolo_infer,
+            class_names=class_names
         )
 
         rate = rospy.Rate(10)
@@ -22,6 +22,10 @@ flags.DEFINE_string('classes', './data/coco.names', 'path to classes file')
 flags.DEFINE_string('image', './data/girl.png', 'path to input image')
 flags.DEFINE_integer('num_classes', 80, 'number of classes in the model')
 flags.DEFINE_integer('size', 416, 'image size')
+flags.DEFINE_boolean('int8', False,
+                     'post-training int8 quantization')
+flags.DEFINE_string('rep_images', './data/*.jpg',
+                    'glob of representative images for int8 calibration')
 
 # TODO: This is broken DOES NOT WORK !!
 def main(_argv):
@@ -34,6 +38,20 @@ def main(_argv):
     logging.info('weights loaded')
 
     converter = tf.lite.TFLiteConverter.from_keras_model(yolo)
+    if FLAGS.int8:
+        # Post-training quantization calibrated on recorded camera
+        # frames; int8 conv halves memory bandwidth on ARM NEON
+        import glob
+
+        def representative_dataset():
+            for path in glob.glob(FLAGS.rep_images):
+                img = tf.image.decode_image(
+                    open(path, 'rb').read(), channels=3)
+                img = tf.expand_dims(img, 0)
+                yield [transform_images(img, FLAGS.size)]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
     tflite_model = converter.convert()
     open(FLAGS.output, 'wb').write(tflite_model)
     logging.info("model saved to: {}".format(FLAGS.output))